@@ -1,18 +1,23 @@
 #!/usr/bin/python3
 # process test_pipeline for batch of test projects
 
+import common
 import lazytp as ltp
 
 import argparse
+import os
 import sys
-from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-def contains_images(folder: Path):
-    image_extensions = ('tif', 'TIF', 'tiff', 'TIFF', 'jpg', 'JPG', 'jpeg', 'JPEG')
-    files = chain(*(folder.glob(f'*.{extension}') for extension in image_extensions))
-    try: next(files);     return True
-    except StopIteration: return False
+
+_IMAGE_SUFFIXES = ('.tif', '.tiff', '.jpg', '.jpeg') # compared against lower-cased file names
+
+
+def contains_images(folder: str | Path):
+    """Check if the folder contains at least one image, using a single directory scan."""
+    with os.scandir(folder) as entries:
+        return any(entry.name.lower().endswith(_IMAGE_SUFFIXES) for entry in entries)
 
 
 class CannotGuessInputImagesFolderException(Exception):
@@ -29,12 +34,13 @@ def guess_images_subfolder(folder: Path):
     and there is none or more than one sub-folders containing images.
     """
     candidates = []
-    for subfolder in folder.iterdir():
-        if subfolder.is_dir():
-            if subfolder.name == 'images':
-                return subfolder
-            elif contains_images(subfolder):
-                candidates.append(subfolder)
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(): # uses the cached d_type, no extra stat for regular directories
+                if entry.name == 'images':
+                    return Path(entry.path)
+                elif contains_images(entry.path):
+                    candidates.append(Path(entry.path))
 
     if len(candidates) == 1:
         return candidates[0]
@@ -54,12 +60,16 @@ def gather_images_paths_from_qa_projects_root(projects_root: Path):
     """
     images_paths = []
     faulty_qa_projects = []
-    candidates = (subfolder for subfolder in projects_root.iterdir() if subfolder.is_dir())
-    for c in candidates:
-        try:
-            images_paths.append(guess_images_subfolder(c))
-        except CannotGuessInputImagesFolderException:
-            faulty_qa_projects.append(c)
+    with os.scandir(projects_root) as entries:
+        candidates = [Path(entry.path) for entry in entries if entry.is_dir()] # is_dir() uses the cached d_type
+    # the guessing is bound by directory listings, threads overlap the waiting on the file system
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        guesses = [executor.submit(guess_images_subfolder, c) for c in candidates]
+        for c, guess in zip(candidates, guesses):
+            try:
+                images_paths.append(guess.result())
+            except CannotGuessInputImagesFolderException:
+                faulty_qa_projects.append(c)
     return {'images_paths': images_paths, 'faulty_qa_projects': faulty_qa_projects}
 
 
@@ -78,16 +88,34 @@ def gather_batchltp_arguments(qa_projects_root_path: Path,
             for image_path in images_paths]
 
 
-def batch_ltp(ltp_arguments: list[dict], live_output: bool = True):
+def batch_ltp(ltp_arguments: list[dict], live_output: bool = True, max_concurrency: int = 1):
     """Call lazy_tp on a batch of projects.
 
     `ltp_arguments` is a list of dictionaries, each containing the inputs for a call to
     lazytp.lazy_tp().
+    `max_concurrency` is the number of lazy_tp calls that may run at the same time. The first
+    project always runs on its own, as it determines the id that is re-used by the others.
+    Results are yielded in the order of `ltp_arguments`. With `max_concurrency` above 1 there is
+    no live output, concurrent outputs would interleave mid-line on screen.
     """
     ltp_arguments = list(ltp_arguments)
-    yield ltp.lazy_test_pipeline(**(ltp_arguments[0]), live_output=live_output)
-    for args in ltp_arguments[1:]:
-        yield ltp.lazy_test_pipeline(**args, reuse_id=True, live_output=live_output)
+    live_output = live_output and max_concurrency <= 1
+    # one Repo per binary, shared by the runs of the batch, git queries like HEAD are resolved once
+    repos = {}
+    for args in ltp_arguments:
+        if args['app_path'] not in repos:
+            repos[args['app_path']] = common.Repo(Path(args['app_path']))
+    run = lambda args, reuse_id: ltp.lazy_test_pipeline(**args, reuse_id=reuse_id, live_output=live_output,
+                                                        repo=repos[args['app_path']])
+
+    yield run(ltp_arguments[0], reuse_id=False)
+
+    run_reusing_id = lambda args: run(args, reuse_id=True)
+    if max_concurrency <= 1:
+        yield from map(run_reusing_id, ltp_arguments[1:])
+        return
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        yield from executor.map(run_reusing_id, ltp_arguments[1:])
 
 
 if __name__ == "__main__":
@@ -134,6 +162,16 @@ if __name__ == "__main__":
         help='Optional description. It will be appended to the output folder names.'
     )
 
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        nargs='?',
+        default=1,
+        const=os.cpu_count() or 1, # cpu_count() is None if it cannot be determined
+        help='Optional, number of projects processed at the same time. Without a value, use the number of CPUs.\n'
+             'With more than one job, the output of test_pipeline is not printed, see log.txt of each project.'
+    )
+
     parser.add_argument('--no-confirmation', action='store_true')
 
     args = parser.parse_args()
@@ -148,7 +186,8 @@ if __name__ == "__main__":
                                              app_path=Path(args.test_pipeline),
                                              out_root_path=Path(args.out_path),
                                              config_path=Path(args.config),
-                                             optional_description=args.description))
+                                             optional_description=args.description),
+                    max_concurrency=args.jobs)
     # trigger all computations
     for _ in gen:
         pass
\ No newline at end of file
@@ -1,10 +1,15 @@
+import codecs
 import configparser
-import datetime
+import functools
 import os
 import re
+import shutil
+import stat
 import sys
 import subprocess
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
@@ -15,15 +20,26 @@ SEPARATOR = '_' # separator to distinguish the different components of a name
                 # (folder name or file name, often also referred to as test case name)
 ID_LEN = 3 # length of the id component (increasing number) to enumerate the
            # different outputs of different invocations of one of the scripts.
+           # Ids are zero-padded to this length, larger ids just get longer.
+PIPE_SIZE = 1024 * 1024 # capacity of the pipe through which we read the output of commands (linux only);
+                        # 1 MiB is the largest size that unprivileged processes may request by default
 
 
 #-------------------------------------------------------------------misc helpers
 # heper functionality that is rather general
 
+_CAMEL_CASE_SEPARATORS = str.maketrans('_.-', '   ') # all separators to ' ', then a plain str.split
+
+
 def camel_case(s: str) -> str:
-    """Turn s into camel case, removing any of the symbols in '_ .-'"""
-    components = re.split("_| |\.|-", s)
-    return components[0] + "".join(c.title() for c in components[1:])
+    """Turn s into camel case, removing any of the symbols in '_ .-'
+
+    Only the first letter of each component is changed, letters that are already upper case
+    (e.g. in 'increase stepSize') are kept.
+    """
+    # runs of separators yield empty components, which contribute nothing to the result
+    components = s.translate(_CAMEL_CASE_SEPARATORS).split(' ')
+    return components[0] + "".join(c[:1].upper() + c[1:] for c in components[1:])
 
 
 def parse_config(config:str) -> configparser.ConfigParser:
@@ -35,17 +51,18 @@ def parse_config(config:str) -> configparser.ConfigParser:
 
 
 def content_of(file: Path) -> str:
-    """Return the content of the file."""
-    result = None
-    with open(file) as f:
-        result = f.read().strip()
-    return result
+    """Return the content of the file, utf-8 decoded like `write_file` encodes it."""
+    return Path(file).read_text(encoding='utf-8').strip()
 
 
 def write_file(content:str, file_path: Path) -> None:
-    """Write the string to a (newly created) file at path."""
-    with open(file_path, 'w') as f:
-        f.write(content)
+    """Write the string to a (newly created) file at path, utf-8 encoded."""
+    Path(file_path).write_bytes(content.encode('utf-8')) # one encode, no incremental text encoder
+
+
+def strip_lines(s: str) -> str:
+    """Strip leading and trailing whitespace from every line of s."""
+    return '\n'.join(line.strip() for line in s.splitlines())
 
 
 def sanitize_command(command: str | list[str]) -> str | list[str]:
@@ -54,56 +71,112 @@ def sanitize_command(command: str | list[str]) -> str | list[str]:
     * Explands tilde to the user's home directory. E.g. ['ls', '~'] -> ['ls', '/home/<username>/']
       where <username> is the actual username.
     """
-    sanitize = lambda x : os.path.expanduser(x) if issubclass(type(x), Path) else x
-    if issubclass(type(command), list):
+    sanitize = lambda x : os.path.expanduser(x) if isinstance(x, Path) else x
+    if isinstance(command, list):
         return [sanitize(component) for component in command]
     else: # no list, hopefully string or Path
         return sanitize(command)
 
 
-def execute_command(command: list[str],
+def _try_to_enlarge_pipe(fd: int) -> None:
+    """Set the capacity of the pipe to PIPE_SIZE, if the system allows it (linux only).
+
+    Best effort, unlike Popen's `pipesize` that raises e.g. if the user exceeds the pipe buffer quota.
+    """
+    try:
+        import fcntl
+        fcntl.fcntl(fd, fcntl.F_SETPIPE_SZ, PIPE_SIZE)
+    except (ImportError, AttributeError, OSError): # no fcntl (windows), no F_SETPIPE_SZ (not linux), refused
+        pass
+
+
+def execute_command(command: str | list[str],
                     out_file: Path = None, # where to store the stdout (and stderr)
                     live_output: bool = False # command's stdout to screen
                     ) -> str:
-    """Execute a command in a shell, print stdout to screen, to a file, or to both.
+    """Execute a command, print stdout to screen, to a file, or to both.
+
+    A string command is run in a shell, a list is executed directly as argument vector.
 
     Returns the stdout of the command.
     """
-    if os.name == 'nt': # on windows, use 'powershell' instead of the default 'cmd'
+    shell = isinstance(command, str) # a shell would only run the first element of a list
+    if shell and os.name == 'nt': # on windows, use 'powershell' instead of the default 'cmd'
         os.environ['COMSPEC'] = 'powershell'
 
-    process = subprocess.Popen(sanitize_command(command),
+    command = sanitize_command(command)
+    if not shell and not os.path.dirname(command[0]):
+        command = [_full_path_of(command[0]), *command[1:]] # e.g. 'cmake', see `subprocess_output`
+
+    if not live_output: # nobody watches, no need to pass the output line by line through python
+        if out_file is None:
+            output = subprocess.run(command,
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT,
+                                    close_fds=False,
+                                    shell=shell).stdout
+        else:
+            with open(out_file, 'wb+') as file:
+                subprocess.run(command, stdout=file, stderr=subprocess.STDOUT, close_fds=False, shell=shell)
+                file.seek(0)
+                output = file.read()
+        return strip_lines(output.decode('utf-8')) # decode once instead of through a text mode pipe
+
+    process = subprocess.Popen(command,
                                stdout=subprocess.PIPE,
                                stderr=subprocess.STDOUT,
-                               encoding='utf-8',
-                               shell=True)
-    output_lines = []
-    file = open(out_file, 'w+') if out_file is not None else None
-
-    for line in iter(process.stdout.readline, ''):
-        if live_output:
-            print(line, end='')
+                               close_fds=False, # posix_spawn, see `subprocess_output`
+                               shell=shell)
+    _try_to_enlarge_pipe(process.stdout.fileno()) # the command does not stall while we print
+    output = bytearray() # the raw bytes are passed on as they are and decoded only once, at the end
+    file = open(out_file, 'wb') if out_file is not None else None
+    screen = getattr(sys.stdout, 'buffer', None) # None if stdout was replaced by a pure text stream
+    # a chunk may end in the middle of a multi-byte character, the decoder keeps it for the next one
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace') if screen is None else None
+    sys.stdout.flush() # keep previously printed text in front of the command's output
+
+    # read whatever is available in large chunks instead of line by line, os.read returns as soon
+    # as the command wrote something
+    stdout_fd = process.stdout.fileno()
+    while chunk := os.read(stdout_fd, 1 << 16):
+        if screen is not None:
+            screen.write(chunk)
+            screen.flush()
+        else:
+            print(decoder.decode(chunk), end='', flush=True)
         if file is not None:
-            file.write(line)
-
-        output_lines.append(line.strip())
+            file.write(chunk)
+        output += chunk
+    if decoder is not None:
+        print(decoder.decode(b'', final=True), end='', flush=True)
 
     if file is not None:
         file.close()
+    process.stdout.close()
+    process.wait()
 
-    return '\n'.join(output_lines)
+    return strip_lines(output.decode('utf-8'))
 
 
 def subprocess_output(command: list[str]) -> str:
     """Return stdout of the command."""
-    result = subprocess.run(sanitize_command(command), capture_output=True)
-    result.check_returncode()
-    return result.stdout.decode('utf-8').strip()
+    # close_fds=False lets CPython start the process via posix_spawn (if the executable is given as a
+    # path), which is cheaper than fork+exec; nothing leaks, python creates descriptors non-inheritable
+    # stderr is not needed, it is not even captured; bytes are decoded without text=True, which would
+    # translate '\r\n' and alter patches of files with windows line endings
+    output = subprocess.check_output(sanitize_command(command), stderr=subprocess.DEVNULL, close_fds=False)
+    return output.decode('utf-8').strip()
+
+
+@functools.lru_cache(maxsize=None)
+def _full_path_of(program: str) -> str:
+    """Return the full path of the program, the plain program name if it is not on the PATH."""
+    return shutil.which(program) or program
 
 
 def git(*args, repo: Path=None) -> str:
     """Call a git command with specified arguments, possibly from outside the repo."""
-    command = ["git"]
+    command = [_full_path_of('git')]
     if repo is not None:
         command += ["-C", repo]
     command.extend(args)
@@ -114,11 +187,34 @@ def is_part_of_git_repo(path: Path) -> bool:
     """Check if path leads to a directory that is inside/part of a git repo."""
     if not path.is_dir():
         path = path.parent
+    return _is_inside_git_work_tree(path.absolute())
+
+
+@functools.lru_cache(maxsize=256) # repos do not appear or vanish while the scripts run
+def _is_inside_git_work_tree(directory: Path) -> bool:
+    """Implementation of `is_part_of_git_repo`, directory must be absolute."""
+    if 'GIT_DIR' in os.environ: # the repo is not found via a '.git' entry, ask git
+        try:
+            git("-C", directory, "rev-parse", "--is-inside-work-tree")
+            return True
+        except subprocess.CalledProcessError:
+            return False
+    # walk up looking for '.git' (a directory, or a file for worktrees and submodules), avoids spawning git
+    return any((d / '.git').exists() for d in (directory, *directory.parents))
+
+
+@functools.lru_cache(maxsize=256)
+def probe_repo(directory: Path) -> tuple[bool, str]:
+    """Return (is inside a work tree, root of the work tree) for the (absolute) directory.
+
+    A single git call answers both, the root is empty if the directory is not inside a work tree.
+    """
     try:
-        git("-C", path, "rev-parse", "--is-inside-work-tree")
-        return True
-    except subprocess.CalledProcessError:
-        return False
+        output = git("rev-parse", "--is-inside-work-tree", "--show-toplevel", repo=directory)
+    except subprocess.CalledProcessError: # not a repo at all, or inside the .git directory
+        return False, ''
+    inside, _, toplevel = output.partition('\n')
+    return inside == 'true', toplevel
 
 
 class colors:
@@ -127,57 +223,89 @@ class colors:
     normal = '\033[0m'
 
 
-def check_executable(app_path: Path, recompile: bool = True, prompt_user_confirmation: bool = True) -> None:
-    """Do some checks for the executable `app_path`.
+def _colored(message: str, color: str, stream) -> str:
+    """Return the message in the color if it goes to a terminal, unchanged otherwise.
 
-    Re-compile to make sure that we are working with an up-to-date version.
-    If the executable is old -> prompt for user confirmation to still use it.
+    Keeps escape sequences out of redirected output, e.g. log files.
+    """
+    return f'{color}{message}{colors.normal}' if stream.isatty() else message
 
-    app_path:                 Path to the executable.
-    recompile:                If false, skip the re-compilation and use the binary, as is.
-    prompt_user_confirmation: If false, do not ask the user to confirm when attempting to use
-                              stale executables.
+
+def _exit_with_error(message: str) -> None:
+    """Write the message to stderr, in red if stderr is a terminal, and exit."""
+    sys.stderr.write(_colored(message, colors.red, sys.stderr) + '\n')
+    sys.exit(-1)
+
+
+def validate_executable(app_path: Path) -> list[str]:
+    """Return the reasons why `app_path` can not be used as executable, an empty list if it can.
+
+    Does not exit, callers that check several executables can collect all of the errors first.
     """
     # path points to nowhere?
-    if not app_path.exists():
-        print(f'{colors.red}',
-              f'binary {app_path} not found',
-              f'{colors.normal}')
-        exit(-1)
+    try:
+        app_stat = os.stat(app_path) # one stat answers all of the checks below
+    except OSError: # not only FileNotFoundError, e.g. NotADirectoryError for 'some_file/app'
+        return [f'binary {app_path} not found']
 
     # binary accidentally a directory?
-    if app_path.is_dir():
-        print(f'{colors.red}',
-              f'binary {app_path} is actually a directory',
-              f'{colors.normal}')
-        exit(-1)
+    if stat.S_ISDIR(app_stat.st_mode):
+        return [f'binary {app_path} is actually a directory']
 
+    errors = []
     # binary not executable?
-    if not os.access(app_path, os.X_OK):
-        print(f'{colors.red}',
-              f'binary {app_path} is not executable',
-              f'{colors.normal}')
-        exit(-1)
+    if not app_stat.st_mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH):
+        errors.append(f'binary {app_path} is not executable')
 
     # binary not part of git repo?
-    if not is_part_of_git_repo(app_path):
-        print(f'{colors.red}',
-              f'binary {app_path} must be inside the repo',
-              f'{colors.normal}')
-        exit(-1)
+    if not _is_inside_git_work_tree(app_path.parent.absolute()): # not a directory, so its parent is the folder to check
+        errors.append(f'binary {app_path} must be inside the repo')
+    return errors
+
+
+def recompile_executables(app_paths: list[Path]) -> None:
+    """Re-compile the executables, with a single cmake call per build folder.
+
+    The build folder of an executable is assumed to be the parent of the folder that contains it.
+    """
+    targets_per_build_folder = {} # insertion ordered, targets are built in the order they were passed
+    for app_path in app_paths:
+        targets_per_build_folder.setdefault(app_path.parent.parent, []).append(app_path.name)
+
+    for build_folder, targets in targets_per_build_folder.items():
+        print(f're-compiling {", ".join(targets)}...')
+        command = ['cmake', '--build', build_folder]
+        for target in targets:
+            command += ['-t', target]
+        execute_command(command, live_output = True)
+
+
+def check_executable(app_path: Path, recompile: bool = True, prompt_user_confirmation: bool = True) -> None:
+    """Do some checks for the executable `app_path`, exit if it can not be used.
+
+    Re-compile to make sure that we are working with an up-to-date version.
+    If the executable is old -> prompt for user confirmation to still use it.
+
+    app_path:                 Path to the executable.
+    recompile:                If false, skip the re-compilation and use the binary, as is.
+    prompt_user_confirmation: If false, do not ask the user to confirm when attempting to use
+                              stale executables.
+    """
+    errors = validate_executable(app_path)
+    if errors:
+        _exit_with_error('\n'.join(errors))
 
     # recompile test_ortho
     if recompile:
-        print(f're-compiling {app_path.name}...')
-        execute_command(f'cmake --build {app_path.parent.parent} -t {app_path.name}', live_output = True)
+        recompile_executables([app_path])
 
     # stale binary?
     if prompt_user_confirmation:
-        seconds_since_last_modification =  int(time.time() - os.path.getmtime(app_path))
+        seconds_since_last_modification =  int(time.time() - os.stat(app_path).st_mtime) # might have been re-built
         if seconds_since_last_modification > 60:
-            print(f'{colors.orange}age:',
-                  f'{datetime.timedelta(seconds=seconds_since_last_modification)}',
-                  f'{colors.normal}')
+            import datetime # only needed for this rare message, not on every import of common
+            print(_colored(f'age: {datetime.timedelta(seconds=seconds_since_last_modification)}',
+                           colors.orange, sys.stdout))
             input('(press any key to continue)')
 
 
@@ -189,6 +317,7 @@ class Repo():
     """
 
     repo: Path # path to the repo on which the git commands shall have effect.
+    _git_cache: dict[tuple[str, ...], str] # results of git queries that do not change during the object's lifetime
 
     class NotARepoException(Exception):
         pass
@@ -196,47 +325,80 @@ class Repo():
     def __init__(self, path_into_repo: Path) -> None:
         if not path_into_repo.is_dir(): # passed path to file inside of repo?
             path_into_repo = path_into_repo.parent
-        if not is_part_of_git_repo(path_into_repo):
+        inside, toplevel = probe_repo(path_into_repo.absolute()) # cached, batches create one Repo per project
+        if not inside:
             raise self.NotARepoException(f"Path '{path_into_repo}' must lead into a git repo.")
-        self.repo = git("rev-parse", "--show-toplevel", repo=path_into_repo)
+        self.repo = toplevel
+        self._git_cache = {} # per object, a new Repo sees e.g. a moved HEAD
 
     def path(self) -> Path:
         """Return path to the repo."""
         return self.repo
 
-    def _git(self, command: str) -> str:
-        """Execute git command on this repo, return stdout(or stderr)."""
-        return git(*command.split(), repo=self.repo)
+    def _git(self, *args: str) -> str:
+        """Execute git command with the given arguments on this repo, return stdout(or stderr)."""
+        return git(*args, repo=self.repo)
+
+    def _cached_git(self, *args: str) -> str:
+        """Like `_git`, but only execute the command once and remember its output.
+
+        Only use this for queries whose result does not change during the lifetime of the object,
+        e.g. resolving commits, not for inspecting the working tree. Batches share one Repo object
+        between their runs to resolve e.g. HEAD only once.
+        """
+        if args not in self._git_cache:
+            self._git_cache[args] = self._git(*args)
+        return self._git_cache[args]
 
     def get_merge_base(self, commit1: str, commit2: str) -> str:
         """Return sha1 of last common ancestor between the two commits."""
-        return self._git(f'merge-base {commit1} {commit2}')
+        return self._cached_git('merge-base', commit1, commit2)
+
+    def snapshot_head(self) -> dict[str, str]:
+        """Return the short sha1 of HEAD and of the refs that could be the main branch, with one git call.
+
+        Returns {'HEAD': <short sha1>, <ref>: <short sha1>, ...}, e.g. with the ref
+        'refs/remotes/origin/master', only refs that exist are included, none for a repo without
+        commits. Remembered like the other queries, see `_cached_git`; short sha1 lookups and
+        `guess_main_branch` are answered from it.
+        """
+        # show-ref matches the end of the ref names, 'master' also lists 'refs/remotes/origin/master'
+        try:
+            output = self._cached_git('show-ref', '--head', '--abbrev', 'master', 'main')
+        except subprocess.CalledProcessError: # show-ref fails if none of the refs exist
+            return {}
+        return {ref: sha1 for sha1, ref in (line.split(' ', 1) for line in output.splitlines())}
+
+    def _rev_parse(self, rev: str, short: bool) -> str:
+        """Return the (short) sha1 of `rev`, from the snapshot if it is there, see `snapshot_head`."""
+        if short and rev in (snapshot := self.snapshot_head()):
+            return snapshot[rev]
+        return self._cached_git('rev-parse', '--short', rev) if short else self._cached_git('rev-parse', rev)
 
     def get_sha_of_branch(self, branch: str, short: bool=False) -> str:
         """Return sha1 on the given branch."""
-        sha1 = self._git(f'rev-parse {branch}')
-        if short:
-            sha1 = self.get_short_sha1(sha1)
-        return sha1
+        return self._rev_parse(branch, short)
 
     def get_short_sha1(self, sha1: str) -> str:
         """Return short version of the sha1."""
-        return self._git(f'rev-parse --short {sha1}')
+        return self._rev_parse(sha1, short=True)
 
     def guess_main_branch(self) -> str:
         """Guess if 'master' or 'main' is used as main development branch."""
         # `git ls-remote --heads origin ...` would fetch the repo, which takes too long
-        for guess in ('origin/master', 'origin/main', 'master', 'main'):
-            try:
-                self._git(f'show-branch {guess}')
-                return f'{guess}'
-            except subprocess.CalledProcessError:
-                pass
+        guesses = {'refs/remotes/origin/master': 'origin/master', # in order of preference
+                   'refs/remotes/origin/main': 'origin/main',
+                   'refs/heads/master': 'master',
+                   'refs/heads/main': 'main'}
+        existing_refs = self.snapshot_head() # a single git call lists all of the guesses that exist
+        for ref, guess in guesses.items():
+            if ref in existing_refs:
+                return guess
         raise RuntimeError(f"Could not guess main branch in repo '{self.repo}'")
 
     def get_patch(self, _from: str, to: str='HEAD') -> str:
         """Get the patch of changes between the two commits _from and to."""
-        return self._git(f'format-patch {_from}..{to} --stdout')
+        return self._git('format-patch', f'{_from}..{to}', '--stdout')
 
     def get_untracked_changes(self) -> str:
         """Return a patch of the untracked changes.
@@ -258,10 +420,10 @@ def add_patch_not_on_main_branch(repo: Repo, out_path: Path, patch_name: str = '
     out_path:   Path to the output folder.
     patch_name: Filename of the file containing the patch.
     """
-    patch_not_on_main_branch = repo.get_patch(_from=repo.get_merge_base('HEAD', repo.guess_main_branch()))
+    # '<main>..HEAD' already means 'commits not on main', no need to look up the merge base first
+    patch_not_on_main_branch = repo.get_patch(_from=repo.guess_main_branch())
     if patch_not_on_main_branch:
-        with open(out_path / patch_name, 'w') as patch_file:
-            patch_file.write(patch_not_on_main_branch)
+        write_file(patch_not_on_main_branch, out_path / patch_name)
 
 
 def add_patch_dirty_state(repo: Repo, out_path: Path, patch_name: str = 'dirtyState.patch') -> None:
@@ -273,8 +435,32 @@ def add_patch_dirty_state(repo: Repo, out_path: Path, patch_name: str = 'dirtySt
     """
     untracked_patch = repo.get_untracked_changes()
     if untracked_patch:
-        with open(out_path / patch_name, 'w') as patch_file:
-            patch_file.write(untracked_patch)
+        write_file(untracked_patch, out_path / patch_name)
+
+
+def add_patches(repo: Repo, out_path: Path) -> None:
+    """Add both the patch of the changes not on the main branch and the patch of the dirty state.
+
+    The two are independent, the git calls generating them run concurrently.
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor: # threads only wait for git, the GIL is no issue
+        patches = [executor.submit(add_patch_not_on_main_branch, repo=repo, out_path=out_path),
+                   executor.submit(add_patch_dirty_state, repo=repo, out_path=out_path)]
+    for patch in patches:
+        patch.result() # re-raises if git failed
+
+
+def _compile_test_case_name_regex() -> re.Pattern:
+    """Compile the regex returned by `test_case_name_regex`."""
+    _id = fr"\d+"
+    sha1 = fr"[^\W_]+" # [^\W_]: alphanumeric without underscore
+    project_name = fr"[^\W_]+"              # [^\W_]: alphanumeric without underscore
+    optional_user_description = fr"[^\W_]*" # [^\W_]: alphanumeric without underscore
+    return re.compile(fr"({_id}){SEPARATOR}({sha1}){SEPARATOR}({project_name}){SEPARATOR}?({optional_user_description})")
+
+
+_TEST_CASE_NAME_RE = _compile_test_case_name_regex() # compiled once, it is matched against every folder name
+                                                     # when looking for the highest id
 
 
 def test_case_name_regex() -> re.Pattern:
@@ -287,16 +473,18 @@ def test_case_name_regex() -> re.Pattern:
     >>> m.group(3)  = 'snowyHillside'
     >>> m.group(4)  = 'increasedStepSizeTo42'
     """
-    _id = fr"\d+"
-    sha1 = fr"[^\W_]+" # [^\W_]: alphanumeric without underscore
-    project_name = fr"[^\W_]+"              # [^\W_]: alphanumeric without underscore
-    optional_user_description = fr"[^\W_]*" # [^\W_]: alphanumeric without underscore
-    return re.compile(fr"({_id}){SEPARATOR}({sha1}){SEPARATOR}({project_name}){SEPARATOR}?({optional_user_description})")
+    return _TEST_CASE_NAME_RE
+
 
+def parse_test_case_name(name: str) -> dict | None:
+    """Returns a dict of the components of the test case name, None if name is no test case name.
 
-def parse_test_case_name(name: str) -> dict:
-    """Returns a dict of the components of the test case name."""
-    m = test_case_name_regex().match(name)
+    Callers that need both can check and parse with a single regex match instead of calling
+    `is_test_case_name` first.
+    """
+    m = _TEST_CASE_NAME_RE.match(name)
+    if m is None:
+        return None
     return {"id" : m.group(1),
             "sha1" : m.group(2),
             "dataset_name" : m.group(3),
@@ -305,7 +493,7 @@ def parse_test_case_name(name: str) -> dict:
 
 def is_test_case_name(s: str) -> bool:
     """Check if s fits the test case name convention."""
-    return bool(test_case_name_regex().match(s))
+    return bool(_TEST_CASE_NAME_RE.match(s))
 
 
 def create_test_case_name(_id: str, sha1: str, project_name: str, optional_description: str = None) -> str:
@@ -317,22 +505,35 @@ def create_test_case_name(_id: str, sha1: str, project_name: str, optional_descr
 
 
 def increment_id(_id: str) -> str:
-    """Return the next id as zero-padded, fixed-length string."""
-    mod = 10**ID_LEN
-    next_id = str((int(_id) + 1) % mod)
-    if next_id == '0': # we start at 1
-        next_id = '1'
-    return '0' * (ID_LEN - len(next_id)) + next_id
+    """Return the next id as string, zero-padded to (at least) ID_LEN digits."""
+    return f'{int(_id) + 1:0{ID_LEN}d}'
 
 
 def find_highest_id(folder: Path) -> str:
     """Find the highest id that is currently in use in the folder."""
-    project_names = (path.name for path in folder.glob("*") if is_test_case_name(path.name))
-    ids = {parse_test_case_name(name)['id'] for name in project_names}
-    zero_id = '0' * ID_LEN
-    return zero_id if not ids else max(ids)
+    with os.scandir(folder) as entries:
+        highest_id = max((int(m.group(1)) for entry in entries if (m := _TEST_CASE_NAME_RE.match(entry.name))),
+                         default=0)
+    return f'{highest_id:0{ID_LEN}d}'
 
 
 def get_next_id(folder: Path) -> str:
     """Return the next id to be used for adding a new test case result to the specified folder."""
     return increment_id(find_highest_id(folder))
+
+
+def create_test_case_folder(out_root_path: Path, create_name: Callable[[], str], attempts: int = 16) -> Path:
+    """Create and return a new folder out_root_path / create_name().
+
+    If the folder exists already, e.g. because a concurrent run took the same id in the meantime,
+    create_name() is called again (yielding the then next id). After `attempts` tries, the
+    FileExistsError is raised. No locking needed, mkdir either creates the folder or fails.
+    """
+    for attempt in range(attempts):
+        out_path = out_root_path / create_name()
+        try:
+            out_path.mkdir()
+            return out_path
+        except FileExistsError:
+            if attempt == attempts - 1:
+                raise
@@ -4,8 +4,10 @@ import common
 
 import argparse
 import configparser
+import io
 import os
 import sys
+from collections.abc import Iterator
 from pathlib import Path
 
 
@@ -53,13 +55,6 @@ def parse_lazyto_out_folder_name(name: str):
     return parsed
 
 
-def ensure_double_quotes(s: str):
-    """Make sure that s is surrounded by double quotes"""
-    if s is None:
-        return s
-    return f'"{s}"' if s[0] != '"' else s
-
-
 def test_ortho(app_path: Path,
                out_path: Path,
                config_path: Path,
@@ -78,11 +73,12 @@ def test_ortho(app_path: Path,
     live_output:               If true, print stdout of test_ortho.
     """
     def append_command_line_argument(command, arguments):
-        return command if arguments is None else command + ' -c ' + ensure_double_quotes(arguments)
+        return command if arguments is None else command + ['-c', arguments]
 
-    command = str(app_path)
+    # passed as argument vector, without a shell in between, so the arguments need no quoting
+    command = [str(app_path)]
     command = append_command_line_argument(command, command_line_arguments)
-    command += ' -f ' + str(config_path)
+    command += ['-f', str(config_path)]
     command = append_command_line_argument(command, command_line_arguments_2)
 
     return common.execute_command(command, out_file=out_path/"log.txt", live_output=live_output)
@@ -98,10 +94,26 @@ def add_to_config(parser: configparser.ConfigParser, section: str, key: str, val
     parser[section][key] = value
 
 
+def config_lines(parser: configparser.ConfigParser) -> Iterator[str]:
+    """Yield the lines of the config in the 'key = value' format, sections separated by a blank line.
+
+    Each section lists the defaults, as well, and the values are interpolated. This is what
+    test_ortho gets to read, it does not know about the DEFAULT section or interpolation.
+    """
+    for i, section in enumerate(parser.sections()):
+        if i > 0:
+            yield '\n'
+        yield f'[{section}]\n'
+        for k, v in parser[section].items():
+            yield f'{k} = {v}\n'
+
+
 def enrich_config(config: str,
                   out_path: Path,
                   debug_output_path: Path = None,
-                  test_pipeline_project_path: Path = None):
+                  test_pipeline_project_path: Path = None,
+                  *,
+                  fp: io.TextIOBase = None):
     """Add/alter fields in the config.
 
     Change the config to make sure that the result ortho is at the right
@@ -117,6 +129,8 @@ def enrich_config(config: str,
                                 an output folder of lazy_test_pipeline. The
                                 config will be altered to read the dsm and
                                 project opf description from this folder.
+    fp:                If not None, the enriched config is written to this file
+                       object instead of being returned as string.
     """
     parser = common.parse_config(config)
 
@@ -133,18 +147,11 @@ def enrich_config(config: str,
         add_to_config(parser, section='images', key='opfProject', value=str(test_pipeline_project_path / 'opf' / 'project.json'))
         add_to_config(parser, section='dsm', key='input_file', value=str(test_pipeline_project_path / 'dsm.tiff'))
 
-    # enriched config to string
-    lines = []
-    for section in parser.sections():
-        lines.append(f'[{section}]\n')
-        for k, v in parser[section].items():
-            lines.append(f'{k} = {v}\n')
-        lines.append('\n')
-    if lines:
-        del lines[-1] # remove spurious last newline
-    enriched_config = ''.join(lines)
-
-    return enriched_config
+    lines = config_lines(parser)
+    if fp is not None: # stream to the destination, no intermediate string
+        fp.writelines(lines)
+        return None
+    return ''.join(lines)
 
 
 def create_enriched_config(config_path: Path,
@@ -164,11 +171,12 @@ def create_enriched_config(config_path: Path,
         sys.exit(-1)
 
     copied_config_path = out_path / enriched_config_name
-    common.write_file(content = enrich_config(config = common.content_of(config_path),
-                                              out_path=out_path,
-                                              debug_output_path=debug_output_path,
-                                              test_pipeline_project_path=test_pipeline_project_path),
-                      file_path = copied_config_path)
+    with open(copied_config_path, 'w', encoding='utf-8') as copied_config: # read as utf-8, see `common.content_of`
+        enrich_config(config = common.content_of(config_path),
+                      out_path=out_path,
+                      debug_output_path=debug_output_path,
+                      test_pipeline_project_path=test_pipeline_project_path,
+                      fp=copied_config)
 
     return copied_config_path
 
@@ -212,11 +220,11 @@ def lazy_test_ortho(app_path: Path,
     """
     repo = common.Repo(app_path)
 
-    out_path = out_root_path / create_lazyto_out_folder_name(repo=repo,
-                                                             out_path=out_root_path,
-                                                             description=description,
-                                                             optional_description=optional_description)
-    out_path.mkdir()
+    create_name = lambda: create_lazyto_out_folder_name(repo=repo,
+                                                        out_path=out_root_path,
+                                                        description=description,
+                                                        optional_description=optional_description)
+    out_path = common.create_test_case_folder(out_root_path, create_name)
 
     debug_output_path = None
     if generate_debug_output:
@@ -228,8 +236,7 @@ def lazy_test_ortho(app_path: Path,
                                                 debug_output_path = debug_output_path,
                                                 test_pipeline_project_path = test_pipeline_project_path)
 
-    common.add_patch_not_on_main_branch(repo=repo, out_path=out_path)
-    common.add_patch_dirty_state(repo=repo, out_path=out_path)
+    common.add_patches(repo=repo, out_path=out_path)
 
     output = test_ortho(app_path = app_path,
                         out_path=out_path,
@@ -2,9 +2,7 @@
 
 import common
 
-import argparse
 import os
-import shutil
 import sys
 from pathlib import Path
 
@@ -17,15 +15,25 @@ def test_pipeline(app_path: Path,
                   out_path: Path,
                   config_path: Path,
                   live_output=True):
-    command = str(app_path)
-    command += ' -f ' + str(config_path)
-    command += ' -o ' + str(out_path)
+    command = [str(app_path), '-f', str(config_path), '-o', str(out_path)]
     return common.execute_command(command, out_file=out_path/"log.txt", live_output=live_output)
 
 
+def list_image_names(images_path: Path) -> list[str]:
+    """Return the names of the files in images_path, sub-folders are skipped.
+
+    Like a glob, a non-existing folder contains no images.
+    """
+    try:
+        with os.scandir(images_path) as entries: # no Path per entry, is_dir() uses the cached d_type
+            return [entry.name for entry in entries if not entry.is_dir()]
+    except FileNotFoundError:
+        return []
+
+
 def create_input_block_for_config(images_path: Path = None):
     """Return a block for the config.ini that contains all input images."""
-    image_names = ','.join(image_path.name for image_path in images_path.glob('*'))
+    image_names = ','.join(list_image_names(images_path))
     return ('[metric]\n'
             f'path = {images_path}\n'
             f'inputs = {image_names}\n')
@@ -77,10 +85,9 @@ def create_enriched_config(config_path: Path, out_path: Path, images_path: Path)
         print(f'Config expected at {config_path.absolute()} but not found.')
         sys.exit(-1)
     path_of_enriched_config = out_path / enriched_config_name
-    shutil.copy(config_path, path_of_enriched_config)
-    with open(path_of_enriched_config, 'a') as f:
-        f.write('\n')
-        f.write(create_input_block_for_config(images_path))
+    # one read and one write, instead of copying the file and re-opening it to append
+    input_block = ('\n' + create_input_block_for_config(images_path)).encode('utf-8')
+    path_of_enriched_config.write_bytes(config_path.read_bytes() + input_block)
     return path_of_enriched_config
 
 
@@ -90,7 +97,8 @@ def lazy_test_pipeline(app_path: Path,
                        config_path: Path,
                        optional_description: str = None,
                        reuse_id: bool = False, # re-use last id to indicate that qa test case belongs to same batch
-                       live_output: bool = True):
+                       live_output: bool = True,
+                       repo: common.Repo = None): # e.g. shared by the runs of a batch, see `Repo._cached_git`
     """Create a folder for the output and write the test_pipeline results to it.
 
     The output folder will be a subfolder of `out_root_path` and will be named
@@ -108,18 +116,19 @@ def lazy_test_pipeline(app_path: Path,
                   is attempted to be derived automatically.
     <optionalDescription> is the `optionalDescription` sanitized into CamelCase.
     """
-    repo = common.Repo(app_path)
-    out_path = out_root_path / get_lazytp_test_case_name(repo=repo,
-                                                         out_path=out_root_path,
-                                                         images_path=images_path,
-                                                         optional_description=optional_description,
-                                                         reuse_id=reuse_id)
-    out_path.mkdir()
+    if repo is None:
+        repo = common.Repo(app_path)
+    create_name = lambda: get_lazytp_test_case_name(repo=repo,
+                                                    out_path=out_root_path,
+                                                    images_path=images_path,
+                                                    optional_description=optional_description,
+                                                    reuse_id=reuse_id)
+    out_path = common.create_test_case_folder(out_root_path, create_name,
+                                              attempts = 1 if reuse_id else 16) # a re-used id must not change
 
     path_of_enriched_config = create_enriched_config(config_path, out_path=out_path, images_path=images_path)
 
-    common.add_patch_not_on_main_branch(repo=repo, out_path=out_path)
-    common.add_patch_dirty_state(repo=repo, out_path=out_path)
+    common.add_patches(repo=repo, out_path=out_path)
 
     output = test_pipeline(app_path = app_path,
                            out_path = out_path,
@@ -131,7 +140,14 @@ def lazy_test_pipeline(app_path: Path,
     return output # for testing purposes
 
 
-if __name__ == '__main__':
+def main(argv: list[str] = None) -> None:
+    """Command line interface of lazy_tp, argv defaults to the arguments of the script.
+
+    Lets other python code, e.g. a batch driver, run lazy_tp in-process instead of starting a new
+    interpreter per call.
+    """
+    import argparse # only needed here, importing lazytp as library (e.g. from batchltp) skips it
+
     parser = argparse.ArgumentParser(
         description =
            """
@@ -174,7 +190,7 @@ if __name__ == '__main__':
 
     parser.add_argument('--no-confirmation', action='store_true')
 
-    args = vars(parser.parse_args())
+    args = vars(parser.parse_args(argv))
 
     common.check_executable(Path(args['test_pipeline']),
                                  recompile = False if os.name == 'nt' else True, # have to figure out how to build using cmake on Windows
@@ -185,3 +201,7 @@ if __name__ == '__main__':
                        images_path = Path(args['images_path']),
                        config_path = Path(args['config']),
                        optional_description=args['description'])
+
+
+if __name__ == '__main__':
+    main()
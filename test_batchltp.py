@@ -157,4 +157,46 @@ def test_batchltp_output_folders_have_the_same_id(two_qa_projects_with_images,
 
     output_folders = [Path(parse_lazytp_call(call)['output']) for call in ltp_calls]
     ids = [common.parse_test_case_name(folder.name)['id'] for folder in output_folders]
-    assert ids[0] == ids[1]
\ No newline at end of file
+    assert ids[0] == ids[1]
+
+
+@skip_on_windows # requires implementing the echo_call_programm mechanic on windows
+def test_concurrent_batchltp_yields_results_in_order_with_the_same_id(make_environment_for_test_pipeline):
+    env = make_environment_for_test_pipeline()
+    images_paths = (Path("project1/images"),
+                    Path("project2/images"),
+                    Path("project3/images"))
+    projects = [make_lazytp_args(env, images_path = images_path) for images_path in images_paths]
+
+    commands_triggered = list(btp.batch_ltp(projects, live_output = False, max_concurrency = 2))
+
+    paths_to_used_configs = [parse_lazytp_call(command_triggered)['config']
+                             for command_triggered in commands_triggered]
+    for images_path, path_to_used_config in zip(images_paths, paths_to_used_configs):
+        assert f'path = {images_path}' in content_of(path_to_used_config)
+    ids = [common.parse_test_case_name(Path(parse_lazytp_call(command_triggered)['output']).name)['id']
+           for command_triggered in commands_triggered]
+    assert len(set(ids)) == 1
+
+
+@skip_on_windows # requires implementing the echo_call_programm mechanic on windows
+def test_concurrent_batchltp_has_no_live_output(make_environment_for_test_pipeline, capsys):
+    env = make_environment_for_test_pipeline()
+    projects = [make_lazytp_args(env, images_path = Path(f"project{i}/images")) for i in range(3)]
+
+    list(btp.batch_ltp(projects, live_output = True, max_concurrency = 2))
+
+    assert capsys.readouterr().out == ''
+
+
+@skip_on_windows # requires implementing the echo_call_programm mechanic on windows
+def test_batchltp_resolves_head_once_for_the_whole_batch(make_environment_for_test_pipeline, monkeypatch):
+    env = make_environment_for_test_pipeline()
+    projects = [make_lazytp_args(env, images_path = Path(f"project{i}/images")) for i in range(3)]
+    git_calls = []
+    original_git = common.git
+    monkeypatch.setattr(common, 'git', lambda *args, **kwargs: git_calls.append(args) or original_git(*args, **kwargs))
+
+    list(btp.batch_ltp(projects, live_output = False))
+
+    assert len([call for call in git_calls if call[0] == 'show-ref']) == 1
@@ -2,8 +2,12 @@ import common
 import lazytp as ltp
 from test_helpers import *
 
+import io
+import os
 import pytest
 import subprocess
+import sys
+import time
 from pathlib import Path
 
 def subprocess_output(command: list[str]):
@@ -20,6 +24,18 @@ def repo_with_dev_branch(repo_dir, repo_with_executable):
     return repo_dir
 
 
+@pytest.fixture
+def git_calls(monkeypatch):
+    """Fixture that yields a list, recording the arguments of every call to `common.git`."""
+    calls = []
+    original_git = common.git
+    def recording_git(*args, **kwargs):
+        calls.append(args)
+        return original_git(*args, **kwargs)
+    monkeypatch.setattr(common, 'git', recording_git)
+    return calls
+
+
 #--------------------------------------------------------------test misc helpers
 def test_camel_case_removes_all_forbidden_symbols():
     non_camel_case_string = "one_two.three_four five six-seven.height-nine"
@@ -27,12 +43,65 @@ def test_camel_case_removes_all_forbidden_symbols():
     assert common.camel_case(non_camel_case_string) == camel_case_string
 
 
+def test_camel_case_keeps_upper_case_letters_inside_components():
+    assert common.camel_case("increase stepSize to_42") == "increaseStepSizeTo42"
+
+
+def test_parse_config_keeps_case_of_keys():
+    parser = common.parse_config('[images]\nopfProject = a.json\n')
+    assert parser['images']['opfProject'] == 'a.json'
+
+
+def test_parse_config_returns_independent_parsers_for_the_same_config():
+    config = '[output]\nfilename = a.tif\n'
+    first = common.parse_config(config)
+    first['output']['filename'] = 'b.tif'
+    first['dsm'] = {}
+
+    second = common.parse_config(config)
+
+    assert second['output']['filename'] == 'a.tif'
+    assert second.sections() == ['output']
+
+
+def test_parse_config_accepts_literal_percent_signs():
+    parser = common.parse_config('[output]\nfilename = a.tif\nquality = 50%\n')
+    assert parser.get('output', 'quality', raw=True) == '50%'
+
+
+def test_parse_config_keeps_defaults_in_default_section():
+    parser = common.parse_config('[DEFAULT]\nbase = x\n\n[images]\npath = a\n')
+    parser['DEFAULT']['base'] = 'y'
+
+    assert parser['images']['base'] == 'y' # still inherited, not copied into the section
+
+
+def test_write_file_and_content_of_round_trip_non_ascii_content(tmp_path):
+    common.write_file('snöwy hillside ✓', tmp_path / 'file.txt')
+    assert common.content_of(tmp_path / 'file.txt') == 'snöwy hillside ✓'
+
+
+def test_sanitize_command_expands_tilde_in_paths_only():
+    home = os.path.expanduser('~')
+    assert common.sanitize_command(['ls', Path('~') / 'data', '~']) == ['ls', os.path.join(home, 'data'), '~']
+
+
 def test_that_path_into_git_repo_is_correctly_detected(repo_with_executable):
     assert common.is_part_of_git_repo(repo_with_executable()['executable'])
 
+
+def test_that_path_into_subfolder_of_git_repo_is_correctly_detected(repo_dir):
+    subfolder = repo_dir / 'sub' / 'folder'
+    subfolder.mkdir(parents=True)
+    assert common.is_part_of_git_repo(subfolder)
+
+
+def test_that_path_outside_of_git_repo_is_correctly_detected(tmp_path):
+    assert not common.is_part_of_git_repo(tmp_path)
+
 def test_execute_command_copies_stdout_to_out_path(tmpdir):
     content = 'hello world!'
-    command = [f'echo "{content}"']
+    command = ['echo', content]
     out_file = tmpdir / "output.txt"
 
     common.execute_command(command, out_file=out_file)
@@ -41,35 +110,266 @@ def test_execute_command_copies_stdout_to_out_path(tmpdir):
     assert stored_content  == content
 
 
+def test_execute_command_returns_stdout():
+    assert common.execute_command('echo "hello world!"') == 'hello world!'
+
+
+def test_execute_command_prints_and_returns_stdout_when_live_output_is_requested(capsys):
+    output = common.execute_command('echo "hello world!"', live_output=True)
+
+    assert output == 'hello world!'
+    assert capsys.readouterr().out == 'hello world!\n'
+
+
+def test_execute_command_writes_live_output_to_out_file(tmp_path, capsys):
+    out_file = tmp_path / 'output.txt'
+
+    common.execute_command(['echo', 'hello world!'], out_file=out_file, live_output=True)
+
+    assert content_of(out_file) == 'hello world!'
+    assert capsys.readouterr().out == 'hello world!\n'
+
+
+@pytest.mark.skipif(not getattr(subprocess, '_USE_POSIX_SPAWN', False), reason='posix_spawn not used on this platform')
+def test_execute_command_starts_argv_commands_with_posix_spawn(monkeypatch):
+    spawned = []
+    original_posix_spawn = os.posix_spawn
+    def recording_posix_spawn(path, *args, **kwargs):
+        spawned.append(path)
+        return original_posix_spawn(path, *args, **kwargs)
+    monkeypatch.setattr(os, 'posix_spawn', recording_posix_spawn)
+
+    assert common.execute_command(['echo', 'hello world!']) == 'hello world!'
+    assert common.execute_command(['echo', 'hello world!'], live_output=True) == 'hello world!'
+    assert len(spawned) == 2
+
+
+def test_execute_command_live_output_works_when_pipe_size_is_refused(monkeypatch, capsys):
+    fcntl = pytest.importorskip('fcntl')
+    def refuse(*args):
+        raise PermissionError('pipe buffer quota exceeded')
+    monkeypatch.setattr(fcntl, 'fcntl', refuse)
+
+    assert common.execute_command(['echo', 'hello world!'], live_output=True) == 'hello world!'
+    assert capsys.readouterr().out == 'hello world!\n'
+
+
+@skip_on_windows # printf is not available on windows
+def test_execute_command_live_output_to_text_stream_keeps_characters_split_between_chunks(monkeypatch):
+    original_read = os.read
+    monkeypatch.setattr(os, 'read', lambda fd, size: original_read(fd, 1 if size == 1 << 16 else size))
+    screen = io.StringIO() # no .buffer, the output has to be decoded while it is printed
+    monkeypatch.setattr(sys, 'stdout', screen)
+
+    assert common.execute_command(['printf', 'snöwy'], live_output=True) == 'snöwy'
+    assert screen.getvalue() == 'snöwy'
+
+
+def test_check_executable_exits_when_binary_does_not_exist(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        common.check_executable(tmp_path / 'app', recompile=False, prompt_user_confirmation=False)
+    assert capsys.readouterr().err == f"binary {tmp_path / 'app'} not found\n" # no color codes, not a tty
+
+
+def test_check_executable_exits_when_path_leads_through_a_file(tmp_path, capsys):
+    (tmp_path / 'some_file').touch()
+    with pytest.raises(SystemExit):
+        common.check_executable(tmp_path / 'some_file' / 'app', recompile=False, prompt_user_confirmation=False)
+    assert capsys.readouterr().err == f"binary {tmp_path / 'some_file' / 'app'} not found\n"
+
+
+def test_check_executable_exits_when_binary_is_a_directory(repo_dir):
+    with pytest.raises(SystemExit):
+        common.check_executable(repo_dir, recompile=False, prompt_user_confirmation=False)
+
+
+@skip_on_windows # file modes are not meaningful on windows
+def test_check_executable_exits_when_binary_is_not_executable(repo_with_executable):
+    app_path = repo_with_executable()['executable']
+    os.chmod(app_path, 0o600)
+    with pytest.raises(SystemExit):
+        common.check_executable(app_path, recompile=False, prompt_user_confirmation=False)
+
+
+def test_check_executable_accepts_executable_inside_repo(repo_with_executable):
+    app_path = repo_with_executable()['executable']
+    common.check_executable(app_path, recompile=False, prompt_user_confirmation=False)
+
+
+def test_check_executable_warns_about_stale_binary_without_color_codes_when_redirected(repo_with_executable,
+                                                                                      monkeypatch, capsys):
+    app_path = repo_with_executable()['executable']
+    os.utime(app_path, (0, time.time() - 3600)) # last modified an hour ago
+    monkeypatch.setattr('builtins.input', lambda prompt: None)
+
+    common.check_executable(app_path, recompile=False, prompt_user_confirmation=True)
+
+    assert capsys.readouterr().out.startswith('age: 1:00:0') # not a tty, no escape sequences
+
+
+@skip_on_windows # file modes are not meaningful on windows
+def test_validate_executable_collects_errors_instead_of_exiting(tmp_path):
+    app_path = tmp_path / 'app'
+    app_path.touch(mode=0o644)
+
+    errors = common.validate_executable(app_path)
+
+    assert errors == [f'binary {app_path} is not executable',
+                      f'binary {app_path} must be inside the repo']
+
+
+def test_validate_executable_reports_only_that_a_directory_is_a_directory(tmp_path):
+    app_path = tmp_path / 'app'
+    app_path.mkdir()
+
+    assert common.validate_executable(app_path) == [f'binary {app_path} is actually a directory']
+
+
+def test_validate_executable_returns_no_errors_for_usable_executable(repo_with_executable):
+    assert common.validate_executable(repo_with_executable()['executable']) == []
+
+
+def test_recompile_executables_builds_all_targets_of_a_build_folder_with_one_call(tmp_path, monkeypatch):
+    commands = []
+    monkeypatch.setattr(common, 'execute_command', lambda command, **kwargs: commands.append(command))
+    build = tmp_path / 'build'
+    other_build = tmp_path / 'otherBuild'
+
+    common.recompile_executables([build / 'bin' / 'app1', build / 'bin' / 'app2', other_build / 'bin' / 'app3'])
+
+    assert commands == [['cmake', '--build', build, '-t', 'app1', '-t', 'app2'],
+                        ['cmake', '--build', other_build, '-t', 'app3']]
+
+
 #----------------------------------------------------------------------test Repo
 def test_repo_class_can_be_constructed_from_repo_path(repo_dir):
     common.Repo(repo_dir)
 
 
+def test_repo_class_looks_up_the_repo_root_only_once(repo_dir, git_calls):
+    first = common.Repo(repo_dir)
+    second = common.Repo(repo_dir)
+
+    assert first.path() == second.path()
+    assert len(git_calls) == 1
+
+
 def test_repo_class_cannot_be_constructed_from_non_repo_path(tmp_path):
     with pytest.raises(common.Repo.NotARepoException):
         common.Repo(tmp_path)
 
 
+def test_repo_class_cannot_be_constructed_from_inside_the_git_directory(repo_dir):
+    with pytest.raises(common.Repo.NotARepoException):
+        common.Repo(repo_dir / '.git')
+
+
+def test_probe_repo_finds_root_of_work_tree_with_a_single_git_call(repo_dir, git_calls):
+    subfolder = repo_dir / 'subfolder'
+    subfolder.mkdir()
+
+    inside, toplevel = common.probe_repo(subfolder.absolute())
+
+    assert inside
+    assert Path(toplevel) == repo_dir.resolve()
+    assert len(git_calls) == 1
+
+
 def test_repo_class_retrieves_patch(repo_with_dev_branch):
     repo = common.Repo(repo_with_dev_branch)
     patch = repo.get_patch(_from=repo.get_merge_base('HEAD', repo.guess_main_branch()))
     file_mode = '100644' if os.name == 'nt' else '100755' # file modes differ on differen OS
     expected_content = ('---\n'
-                        ' app | 1 +\n'
-                        ' 1 file changed, 1 insertion(+)\n'
+                        ' app | 2 ++\n'
+                        ' 1 file changed, 2 insertions(+)\n'
                         f' create mode {file_mode} app\n\n'
                         'diff --git a/app b/app\n'
                         f'new file mode {file_mode}\n'
-                        'index 0000000..827a748\n'
+                        'index 0000000..52d4b2f\n'
                         '--- /dev/null\n'
                         '+++ b/app\n'
-                        '@@ -0,0 +1 @@\n'
+                        '@@ -0,0 +1,2 @@\n'
+                        '+#!/bin/sh\n'
                         '+echo $0 $@\n'
                         '\\ No newline at end of file\n')
     assert expected_content in patch
 
 
+def test_repo_class_guesses_local_main_branch(repo_dir):
+    git('branch', '-M', 'main', repo=repo_dir)
+    assert common.Repo(repo_dir).guess_main_branch() == 'main'
+
+
+def test_repo_class_prefers_remote_main_branch(repo_dir):
+    git('branch', '-M', 'main', repo=repo_dir)
+    git('update-ref', 'refs/remotes/origin/master', 'HEAD', repo=repo_dir)
+    assert common.Repo(repo_dir).guess_main_branch() == 'origin/master'
+
+
+def test_repo_class_raises_when_main_branch_cannot_be_guessed(repo_dir):
+    git('branch', '-M', 'feature', repo=repo_dir)
+    with pytest.raises(RuntimeError):
+        common.Repo(repo_dir).guess_main_branch()
+
+
+def test_repo_class_returns_short_sha1_of_branch(repo_dir):
+    repo = common.Repo(repo_dir)
+    short_sha1 = repo.get_sha_of_branch('HEAD', short=True)
+    assert short_sha1 == repo.get_short_sha1(repo.get_sha_of_branch('HEAD'))
+    assert repo.get_sha_of_branch('HEAD').startswith(short_sha1)
+
+
+def test_repo_class_resolves_commits_only_once(repo_dir, git_calls):
+    repo = common.Repo(repo_dir)
+    git_calls.clear()
+
+    first = repo.get_sha_of_branch('HEAD')
+    second = repo.get_sha_of_branch('HEAD')
+
+    assert first == second
+    assert len(git_calls) == 1
+
+
+def test_new_repo_object_sees_moved_head(repo_dir):
+    before = common.Repo(repo_dir).get_sha_of_branch('HEAD', short=True)
+    git('commit', '--allow-empty', '-m', 'moved HEAD', repo=repo_dir)
+
+    after = common.Repo(repo_dir).get_sha_of_branch('HEAD', short=True)
+
+    assert after != before
+    assert after == git('rev-parse', '--short', 'HEAD', repo=repo_dir)
+
+
+def test_repo_snapshot_answers_short_head_and_main_branch_with_one_git_call(repo_with_dev_branch, git_calls):
+    repo = common.Repo(repo_with_dev_branch)
+    git_calls.clear()
+
+    short_sha1 = repo.get_sha_of_branch('HEAD', short=True)
+    main_branch = repo.guess_main_branch()
+
+    assert len(git_calls) == 1
+    assert short_sha1 == git('rev-parse', '--short', 'HEAD', repo=repo_with_dev_branch)
+    assert main_branch == 'master'
+
+
+def test_repo_snapshot_answers_short_sha1_of_any_ref_it_lists(repo_dir, git_calls):
+    repo = common.Repo(repo_dir)
+    ref, sha1 = next((ref, sha1) for ref, sha1 in repo.snapshot_head().items() if ref != 'HEAD')
+    git_calls.clear()
+
+    assert repo.get_short_sha1(ref) == sha1 == git('rev-parse', '--short', ref, repo=repo_dir)
+    assert len(git_calls) == 0
+
+
+def test_repo_class_raises_for_short_sha1_of_head_without_commits(tmp_path):
+    git('init', tmp_path)
+    repo = common.Repo(tmp_path)
+
+    assert repo.snapshot_head() == {}
+    with pytest.raises(subprocess.CalledProcessError):
+        repo.get_sha_of_branch('HEAD', short=True)
+
+
 def test_repo_class_untracked_changes_returns_correct_patch_when_there_are_changes(repo_with_executable):
     repo_and_executable = repo_with_executable()
     with open(repo_and_executable['executable'], 'a') as file:
@@ -80,7 +380,8 @@ def test_repo_class_untracked_changes_returns_correct_patch_when_there_are_chang
 
     expected_content = ('--- a/app\n'
                         '+++ b/app\n'
-                        '@@ -1 +1 @@\n'
+                        '@@ -1,2 +1,2 @@\n'
+                        ' #!/bin/sh\n'
                         '-echo $0 $@\n'
                         '\\ No newline at end of file\n'
                         '+echo $0 $@untracked content\n'
@@ -95,10 +396,63 @@ def test_repo_class_untracked_changes_returns_empty_patch_when_there_are_no_chan
 
 
 #----------------------------------------------------------test specific helpers
+def test_add_patch_not_on_main_branch_writes_commits_of_dev_branch(repo_with_dev_branch, tmp_path):
+    repo = common.Repo(repo_with_dev_branch)
+    out_path = tmp_path / 'out'
+    out_path.mkdir()
+
+    common.add_patch_not_on_main_branch(repo=repo, out_path=out_path)
+
+    patch = content_of(out_path / 'notOnMainBranch.patch')
+    assert 'added executable' in patch
+    assert 'dummy commit' not in patch
+
+
+def test_add_patches_writes_both_patches(repo_with_dev_branch, tmp_path):
+    (repo_with_dev_branch / 'app').write_text('changed, but not committed')
+    repo = common.Repo(repo_with_dev_branch)
+    out_path = tmp_path / 'out'
+    out_path.mkdir()
+
+    common.add_patches(repo=repo, out_path=out_path)
+
+    assert 'added executable' in content_of(out_path / 'notOnMainBranch.patch')
+    assert 'changed, but not committed' in content_of(out_path / 'dirtyState.patch')
+
+
+def test_parse_test_case_name_returns_components():
+    assert common.parse_test_case_name('001_1234567_snowyHillside_increasedStepSize') == {
+        'id': '001', 'sha1': '1234567', 'dataset_name': 'snowyHillside', 'optional_description': 'increasedStepSize'}
+
+
+def test_parse_test_case_name_returns_none_for_other_names():
+    assert common.parse_test_case_name('notATestCase') is None
+
+
 def test_get_next_id_returns_the_correct_id(out_dir_with_test_case_results):
     assert common.get_next_id(out_dir_with_test_case_results) == '004' # highest existing id is '003'
 
 
+def test_increment_id_returns_zero_padded_id():
+    assert common.increment_id('000') == '001'
+    assert common.increment_id('041') == '042'
+
+
+def test_increment_id_does_not_wrap_around():
+    assert common.increment_id('999') == '1000'
+
+
+def test_find_highest_id_compares_ids_numerically(tmp_path):
+    for directory_name in ('99_1234_project1', '100_1234_project1'):
+        (tmp_path / directory_name).mkdir()
+    assert common.find_highest_id(tmp_path) == '100'
+
+
+def test_find_highest_id_returns_zero_id_for_folder_without_test_cases(tmp_path):
+    (tmp_path / 'not_a_test_case').mkdir()
+    assert common.find_highest_id(tmp_path) == '000'
+
+
 def test_that_test_case_names_are_correct_when_no_description_given():
     sha1 = '1234567890'
     _id = '001'
@@ -125,4 +479,29 @@ def test_create_input_block_for_config_returns_correct_block(make_environment_fo
     expected = ('[metric]\n'
                 f"path = {env['images_path']}\n"
                 f'inputs = {image_names}\n')
-    assert config_block == expected
\ No newline at end of file
+    assert config_block == expected
+
+
+def test_list_image_names_skips_subfolders(tmp_path):
+    (tmp_path / 'a.jpg').touch()
+    (tmp_path / 'b.JPG').touch()
+    (tmp_path / 'subfolder').mkdir()
+
+    assert sorted(ltp.list_image_names(tmp_path)) == ['a.jpg', 'b.JPG']
+
+
+def test_create_test_case_folder_retries_with_new_name_if_folder_exists(tmp_path):
+    (tmp_path / '001_abc_project').mkdir() # e.g. created by a concurrent run
+    names = iter(['001_abc_project', '002_abc_project'])
+
+    out_path = common.create_test_case_folder(tmp_path, lambda: next(names))
+
+    assert out_path == tmp_path / '002_abc_project'
+    assert out_path.is_dir()
+
+
+def test_create_test_case_folder_raises_after_last_attempt(tmp_path):
+    (tmp_path / '001_abc_project').mkdir()
+
+    with pytest.raises(FileExistsError):
+        common.create_test_case_folder(tmp_path, lambda: '001_abc_project', attempts=2)
@@ -31,7 +31,7 @@ def subprocess_output(command: list[str]):
     return result.stdout.decode('utf-8').strip()
 
 
-echo_call_program = "echo $0 $@"
+echo_call_program = "#!/bin/sh\necho $0 $@"
 
 
 def git(*args, repo: Path=None):
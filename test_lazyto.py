@@ -4,6 +4,7 @@ from test_helpers import *
 
 from pathlib import Path
 import configparser
+import io
 import re
 import tempfile
 
@@ -175,6 +176,45 @@ def test_enriched_config_has_correct_out_path():
     assert(common.parse_config( enriched )['output']['filename'] == str(out_path / f'{out_path.name}.tif'))
 
 
+def test_enriched_config_keeps_format_of_original_config():
+    config = '[images]\nopfProject = a.json\n\n[output]\nfilename = old.tif\n'
+
+    enriched = lto.enrich_config(config=config, out_path=Path('new'))
+
+    assert enriched == f'[images]\nopfProject = a.json\n\n[output]\nfilename = {Path("new") / "new.tif"}\n'
+
+
+def test_enriched_config_lists_defaults_in_each_section_and_interpolates_values():
+    config = '[DEFAULT]\nbase = /data\n\n[images]\npath = %(base)s/images\n'
+
+    enriched = lto.enrich_config(config=config, out_path=Path('new'))
+
+    assert enriched == ('[images]\npath = /data/images\nbase = /data\n\n' # test_ortho knows no DEFAULT section
+                        f'[output]\nfilename = {Path("new") / "new.tif"}\nbase = /data\n')
+
+
+def test_enriched_config_can_be_written_to_a_file_object():
+    config = '[images]\nopfProject = a.json\n'
+    written = io.StringIO()
+
+    returned = lto.enrich_config(config=config, out_path=Path('new'), fp=written)
+
+    assert returned is None
+    assert common.parse_config(written.getvalue())['output']['filename'] == str(Path('new') / 'new.tif')
+    assert written.getvalue() == lto.enrich_config(config=config, out_path=Path('new'))
+
+
+def test_create_enriched_config_keeps_non_ascii_values(tmp_path):
+    config_path = tmp_path / 'config.ini'
+    common.write_file('[images]\nprojectName = snöwy hillside\n', config_path)
+    out_path = tmp_path / 'out'
+    out_path.mkdir()
+
+    copied_config_path = lto.create_enriched_config(config_path, out_path, None, None)
+
+    assert 'projectName = snöwy hillside' in common.content_of(copied_config_path)
+
+
 def test_enriched_config_has_correct_debug_path():
     debug_out_path = Path('/path/to/debug')
 
@@ -83,6 +83,19 @@ def test_lazy_test_pipeline_writes_log_to_qa_test_case_folder(make_environment_f
     assert 'log.txt' in {content.name for content in new_qa_test_case_path.glob('*')}
 
 
+def test_main_runs_lazy_test_pipeline_with_the_given_arguments(make_environment_for_test_pipeline, monkeypatch):
+    env = make_environment_for_test_pipeline()
+    monkeypatch.setattr(common, 'check_executable', lambda *args, **kwargs: None) # no cmake in the tests
+
+    ltp.main(['-x', str(env['app_path']),
+              '-i', str(env['images_path']),
+              '-o', str(env['out_path']),
+              '-c', str(env['config_path']),
+              '-d', 'from main'])
+
+    assert len(list(env['out_path'].glob('*_fromMain'))) == 1
+
+
 def test_stitched_result_name_contains_id_and_description():
     result_name = ltp.derive_stitched_result_name('015_1234567890_snowyHillside_increasedStepSizeTo42')
     assert result_name == '015_snowyHillside_increasedStepSizeTo42_stitched.tiff'